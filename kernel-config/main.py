@@ -5,8 +5,10 @@ Usage: uv run <enable|disable> [core_range]
 
 import sys
 import os
+import re
+import shutil
+import pathlib
 import subprocess
-import curses
 from typing import Dict, List, Tuple
 
 KERNEL_PARAMS = {
@@ -68,224 +70,357 @@ KERNEL_PARAMS = {
 }
 
 PARAM_ORDER = [
-    "isolcpus", "nohz_full", "rcu_nocbs", "housekeeping", "intel_pstate", 
-    "nosmt", "intel_idle_cstate", "processor_cstate", "mitigations", 
+    "isolcpus", "nohz_full", "rcu_nocbs", "housekeeping", "intel_pstate",
+    "nosmt", "intel_idle_cstate", "processor_cstate", "mitigations",
     "intel_iommu", "iommu"
 ]
 
+# Structure-of-arrays view of KERNEL_PARAMS: parallel tuples indexed by
+# menu position, so the hot paths do integer indexing instead of
+# string-keyed dict lookups
+_KEYS = tuple(PARAM_ORDER)
+_PARAMS = tuple(KERNEL_PARAMS[k]["param"] for k in _KEYS)
+_DESCS = tuple(KERNEL_PARAMS[k]["desc"] for k in _KEYS)
+_INFOS = tuple(KERNEL_PARAMS[k]["info"] for k in _KEYS)
+
+# Cmdline token prefixes this script owns (e.g. "isolcpus", "nosmt");
+# anything else found in GRUB_CMDLINE_LINUX_DEFAULT is left alone.
+# Bytes, to match the binary-mode config I/O below.
+_MANAGED_KEYS = {v["param"].split("=", 1)[0].encode() for v in KERNEL_PARAMS.values()}
+
+# Matches the whole GRUB_CMDLINE_LINUX_DEFAULT line, capturing the value;
+# subn's replacement count doubles as the "line present?" check
+_GRUB_RE = re.compile(rb'^GRUB_CMDLINE_LINUX_DEFAULT="(.*)"$', re.M)
+
 class KernelConfigMenu:
     def __init__(self, core_range: str):
         self.core_range = core_range
-        self.selected = {key: True for key in PARAM_ORDER}
+        self.selected = bytearray(b"\x01" * len(_KEYS))
         self.current = 0
         self.offset = 0
-        
-    def draw_menu(self, stdscr):
+        # core_range is fixed for the life of the menu, so render the
+        # {CORES} templates once instead of on every redraw/apply
+        self.rendered = tuple(p.replace("{CORES}", core_range) for p in _PARAMS)
+        # Both checkbox states of every row are immutable, so build them
+        # up front and just pick one at render time
+        self._row_on = tuple(
+            f"  [X] {key:<18} {desc}" for key, desc in zip(_KEYS, _DESCS))
+        self._row_off = tuple(
+            f"  [ ] {key:<18} {desc}" for key, desc in zip(_KEYS, _DESCS))
+        # Terminal geometry, refreshed only on start-up and KEY_RESIZE so
+        # redraws skip the getmaxyx call
+        self._h = 0
+        self._w = 0
+        # Info-panel strings, rendered (and truncated) lazily per row;
+        # truncation depends on the width, so resize invalidates it
+        self._info_cache = {}
+
+    def _resize(self, stdscr):
         height, width = stdscr.getmaxyx()
-        menu_height = height - 6  # Leave space for header, footer, and info
-        
-        # Clear screen
-        stdscr.clear()
+        if (height, width) != (self._h, self._w):
+            self._h, self._w = height, width
+            self._info_cache.clear()
+            # Re-clamp the scroll window so the cursor row stays visible
+            # after a shrink; otherwise later repaints would target rows
+            # past the last line
+            menu_height = max(1, height - 6)
+            if self.current >= self.offset + menu_height:
+                self.offset = self.current - menu_height + 1
+
+    def _info_for(self, i):
+        info_text = self._info_cache.get(i)
+        if info_text is None:
+            info_text = f"{self.rendered[i]}: {_INFOS[i]}"
+            # Wrap text if too long
+            if len(info_text) > self._w - 4:
+                info_text = info_text[:self._w - 7] + "..."
+            self._info_cache[i] = info_text
+        return info_text
         
-        # Header
+    def _draw_header(self, stdscr):
         stdscr.addstr(0, 2, f"Kernel Configuration - Core Range: {self.core_range}", curses.A_BOLD)
         stdscr.addstr(1, 2, "Use ↑↓ to navigate, SPACE to toggle, ENTER to apply, q to quit")
-        stdscr.addstr(2, 0, "─" * (width - 1))
-        
-        # Calculate visible range
-        visible_start = self.offset
-        visible_end = min(len(PARAM_ORDER) + 1, visible_start + menu_height)
-        
-        # Draw menu items
-        for i in range(visible_start, visible_end):
-            y_pos = 3 + (i - visible_start)
-            
-            if i < len(PARAM_ORDER):
-                key = PARAM_ORDER[i]
-                param_info = KERNEL_PARAMS[key]
-                
-                # Checkbox
-                checkbox = "[X]" if self.selected[key] else "[ ]"
-                
-                # Highlight current item
-                attr = curses.A_REVERSE if i == self.current else curses.A_NORMAL
-                
-                # Format line
-                line = f"  {checkbox} {key:<18} {param_info['desc']}"
-                line = line[:width-2]  # Truncate if too long
-                
-                stdscr.addstr(y_pos, 0, line, attr)
-            else:
-                # Apply option
-                attr = curses.A_REVERSE if i == self.current else curses.A_NORMAL
-                stdscr.addstr(y_pos, 0, "  >> Apply Configuration", attr | curses.A_BOLD)
-        
+        # hline draws from curses' own character table — no Python-side
+        # string allocation or re-encode per frame
+        stdscr.hline(2, 0, curses.ACS_HLINE, self._w - 1)
+
+    def _draw_row(self, stdscr, i):
+        # Paint a single menu row in place; caller guarantees i is visible
+        y_pos = 3 + (i - self.offset)
+        attr = curses.A_REVERSE if i == self.current else curses.A_NORMAL
+        stdscr.move(y_pos, 0)
+        stdscr.clrtoeol()
+
+        if i < len(_KEYS):
+            # Pick the prebuilt row for the checkbox state, truncated if too long
+            rows = self._row_on if self.selected[i] else self._row_off
+            stdscr.addstr(y_pos, 0, rows[i][:self._w - 2], attr)
+        else:
+            # Apply option
+            stdscr.addstr(y_pos, 0, "  >> Apply Configuration", attr | curses.A_BOLD)
+
+    def _draw_info(self, stdscr):
         # Info panel at bottom
-        info_y = height - 3
-        stdscr.addstr(info_y, 0, "─" * (width - 1))
-        
-        if self.current < len(PARAM_ORDER):
-            key = PARAM_ORDER[self.current]
-            param_info = KERNEL_PARAMS[key]
-            info_text = f"{param_info['param'].replace('{CORES}', self.core_range)}: {param_info['info']}"
-            # Wrap text if too long
-            if len(info_text) > width - 4:
-                info_text = info_text[:width-7] + "..."
-            stdscr.addstr(info_y + 1, 2, info_text)
+        info_y = self._h - 3
+        stdscr.move(info_y + 1, 0)
+        stdscr.clrtoeol()
+
+        if self.current < len(_KEYS):
+            stdscr.addstr(info_y + 1, 2, self._info_for(self.current))
         else:
             stdscr.addstr(info_y + 1, 2, "Apply the selected kernel parameters to GRUB configuration")
-        
-        stdscr.refresh()
-    
+
+    def draw_menu(self, stdscr):
+        # Full repaint: first draw, resize, scroll, and toggles. Arrow-key
+        # navigation goes through the incremental path in handle_input.
+        menu_height = self._h - 6  # Leave space for header, footer, and info
+
+        # Clear screen (erase marks cells dirty without an immediate repaint,
+        # so the whole frame goes out in one flush below)
+        stdscr.erase()
+        self._draw_header(stdscr)
+
+        # Draw visible menu items
+        visible_end = min(len(_KEYS) + 1, self.offset + menu_height)
+        for i in range(self.offset, visible_end):
+            self._draw_row(stdscr, i)
+
+        stdscr.hline(self._h - 3, 0, curses.ACS_HLINE, self._w - 1)
+        self._draw_info(stdscr)
+
+        stdscr.noutrefresh()
+        curses.doupdate()
+
+    def _nav_repaint(self, stdscr, prev):
+        # Arrow keys only move the highlight, so repaint just the two
+        # affected rows plus the info line — O(1) bytes on the wire
+        # instead of a full-screen redraw (matters over slow consoles)
+        menu_height = self._h - 6
+        visible = range(self.offset, self.offset + menu_height)
+        if prev not in visible or self.current not in visible:
+            # Either row fell outside the window (e.g. the terminal shrank
+            # underneath us); repaint everything rather than draw off-screen
+            self.draw_menu(stdscr)
+            return
+        self._draw_row(stdscr, prev)
+        self._draw_row(stdscr, self.current)
+        self._draw_info(stdscr)
+        stdscr.noutrefresh()
+        curses.doupdate()
+
     def handle_input(self, stdscr):
+        self._resize(stdscr)
+        self.draw_menu(stdscr)
         while True:
-            self.draw_menu(stdscr)
             key = stdscr.getch()
-            
+            dirty = False
+
             if key == curses.KEY_UP:
-                self.current = max(0, self.current - 1)
-                # Adjust offset for scrolling
-                if self.current < self.offset:
-                    self.offset = self.current
-                    
+                if self.current > 0:
+                    prev = self.current
+                    self.current -= 1
+                    if self.current < self.offset:
+                        # Scrolled: the whole menu shifts, full repaint
+                        self.offset = self.current
+                        dirty = True
+                    else:
+                        self._nav_repaint(stdscr, prev)
+
             elif key == curses.KEY_DOWN:
-                self.current = min(len(PARAM_ORDER), self.current + 1)
-                # Adjust offset for scrolling
-                height, _ = stdscr.getmaxyx()
-                menu_height = height - 6
-                if self.current >= self.offset + menu_height:
-                    self.offset = self.current - menu_height + 1
-                    
-            elif key == ord(' ') and self.current < len(PARAM_ORDER):
+                if self.current < len(_KEYS):
+                    prev = self.current
+                    self.current += 1
+                    menu_height = self._h - 6
+                    if self.current >= self.offset + menu_height:
+                        # Scrolled: the whole menu shifts, full repaint
+                        self.offset = self.current - menu_height + 1
+                        dirty = True
+                    else:
+                        self._nav_repaint(stdscr, prev)
+
+            elif key == ord(' ') and self.current < len(_KEYS):
                 # Toggle selection
-                param_key = PARAM_ORDER[self.current]
-                self.selected[param_key] = not self.selected[param_key]
-                
+                self.selected[self.current] ^= 1
+                dirty = True
+
+            elif key == curses.KEY_RESIZE:
+                self._resize(stdscr)
+                dirty = True
+
             elif key == ord('\n') or key == curses.KEY_ENTER:
-                if self.current == len(PARAM_ORDER):
+                if self.current == len(_KEYS):
                     # Apply configuration
                     return True
-                    
+
             elif key == ord('q') or key == ord('Q'):
                 return False
+
+            # Unknown keys and presses at the boundary change nothing,
+            # so skip the repaint entirely
+            if dirty:
+                self.draw_menu(stdscr)
     
     def get_selected_params(self) -> str:
-        params = []
-        for key in PARAM_ORDER:
-            if self.selected[key]:
-                param = KERNEL_PARAMS[key]["param"].replace("{CORES}", self.core_range)
-                params.append(param)
-        return " ".join(params)
+        # Keyed on the token prefix so repeated selections of the same
+        # parameter collapse to a single cmdline entry
+        params = {}
+        for i, param in enumerate(self.rendered):
+            if self.selected[i]:
+                params[param.split("=", 1)[0]] = param
+        return " ".join(params.values())
 
 def check_root():
     if os.geteuid() != 0:
         print("Error: This script must be run as root (use sudo)")
         sys.exit(1)
 
+def run_update_grub():
+    # grub-mkconfig takes seconds (os-prober, filesystem scans); stream its
+    # output as it arrives so the user sees progress instead of a stall
+    proc = subprocess.Popen(["update-grub"], stdout=subprocess.PIPE,
+                            stderr=subprocess.STDOUT, text=True)
+    for line in proc.stdout:
+        sys.stdout.write(line)
+    if proc.wait() != 0:
+        raise subprocess.CalledProcessError(proc.returncode, "update-grub")
+
 def update_grub_config(params: str):
-    grub_config = "/etc/default/grub"
-    
+    grub_config = pathlib.Path("/etc/default/grub")
+
     try:
-        # Backup original file
-        subprocess.run(["cp", grub_config, f"{grub_config}.backup"], check=True)
-        
-        # Read current config
-        with open(grub_config, 'r') as f:
-            lines = f.readlines()
-        
-        # Update GRUB_CMDLINE_LINUX_DEFAULT
-        updated = False
-        for i, line in enumerate(lines):
-            if line.startswith("GRUB_CMDLINE_LINUX_DEFAULT="):
-                lines[i] = f'GRUB_CMDLINE_LINUX_DEFAULT="{params}"\n'
-                updated = True
-                break
-        
-        if not updated:
-            lines.append(f'GRUB_CMDLINE_LINUX_DEFAULT="{params}"\n')
-        
-        # Write updated config
-        with open(grub_config, 'w') as f:
-            f.writelines(lines)
-        
+        # Read current config in one pass; binary mode skips the codec
+        # round-trip — the file is plain ASCII shell syntax
+        data = grub_config.read_bytes()
+
+        # Merge with the installed value: tokens we don't manage (hand
+        # edits) are preserved, stale managed tokens from earlier runs are
+        # dropped so core-range changes never accumulate duplicates
+        match = _GRUB_RE.search(data)
+        current = match.group(1) if match else b""
+        kept = [t for t in current.split() if t.split(b"=", 1)[0] not in _MANAGED_KEYS]
+        merged = b" ".join(kept + params.encode().split())
+
+        # Render the updated GRUB_CMDLINE_LINUX_DEFAULT line; subn does the
+        # scan in C and tells us whether the line was present at all
+        new_line = b'GRUB_CMDLINE_LINUX_DEFAULT="' + merged + b'"'
+        new, n = _GRUB_RE.subn(new_line, data, count=1)
+        if n == 0:
+            new = data + new_line + b"\n"
+
+        # Skip the backup, rewrite, and update-grub entirely when the
+        # installed config already matches (repeat runs would otherwise
+        # pay a file copy plus a full grub-mkconfig pass for nothing)
+        if new == data:
+            return True
+
+        # Backup via hardlink: a single link() syscall, no data copy.
+        # Falls back to a real copy where the filesystem doesn't allow it.
+        backup = f"{grub_config}.backup"
+        try:
+            os.unlink(backup)
+        except FileNotFoundError:
+            pass
+        try:
+            os.link(grub_config, backup)
+        except OSError:
+            shutil.copyfile(grub_config, backup)
+
+        # Write updated config to a temp name and rename into place, so
+        # the hardlinked backup keeps pointing at the original content.
+        # Carry the source mode over: the temp file starts umask-derived,
+        # which would otherwise tighten the config on hardened hosts.
+        tmp = grub_config.with_suffix(".tmp")
+        tmp.write_bytes(new)
+        shutil.copymode(grub_config, tmp)
+        os.replace(tmp, grub_config)
+
         # Update grub
-        subprocess.run(["update-grub"], check=True)
-        
+        run_update_grub()
+
         return True
     except Exception as e:
         print(f"Error updating GRUB configuration: {e}")
         return False
 
 def clear_grub_config():
-    grub_config = "/etc/default/grub"
-    
+    grub_config = pathlib.Path("/etc/default/grub")
+
     try:
-        # Read current config
-        with open(grub_config, 'r') as f:
-            lines = f.readlines()
-        
-        # Clear GRUB_CMDLINE_LINUX_DEFAULT
-        for i, line in enumerate(lines):
-            if line.startswith("GRUB_CMDLINE_LINUX_DEFAULT="):
-                lines[i] = 'GRUB_CMDLINE_LINUX_DEFAULT=""\n'
-                break
-        
+        # Read current config in one pass (binary, see update_grub_config)
+        data = grub_config.read_bytes()
+
+        # Clear GRUB_CMDLINE_LINUX_DEFAULT; nothing to do if it is
+        # already empty (or absent)
+        new, n = _GRUB_RE.subn(b'GRUB_CMDLINE_LINUX_DEFAULT=""', data, count=1)
+        if n == 0 or new == data:
+            return True
+
         # Write updated config
-        with open(grub_config, 'w') as f:
-            f.writelines(lines)
-        
+        grub_config.write_bytes(new)
+
         # Update grub
-        subprocess.run(["update-grub"], check=True)
-        
+        run_update_grub()
+
         return True
     except Exception as e:
         print(f"Error clearing GRUB configuration: {e}")
         return False
 
+def _enable(core_range: str):
+    # curses is only needed for the interactive menu; importing it here
+    # keeps the disable path and error exits off its start-up cost
+    global curses
+    import curses
+
+    menu = KernelConfigMenu(core_range)
+
+    try:
+        apply_config = curses.wrapper(menu.handle_input)
+
+        if apply_config:
+            selected_params = menu.get_selected_params()
+
+            if selected_params:
+                print(f"Applying parameters: {selected_params}")
+                if update_grub_config(selected_params):
+                    print("✓ Selected kernel parameters installed. Reboot to apply.")
+                else:
+                    print("✗ Failed to update kernel parameters.")
+                    sys.exit(1)
+            else:
+                print("No parameters selected. Exiting.")
+        else:
+            print("Configuration cancelled.")
+
+    except KeyboardInterrupt:
+        print("\nConfiguration cancelled.")
+        sys.exit(0)
+
+def _disable(core_range: str):
+    if clear_grub_config():
+        print("✓ Kernel parameters cleared. Reboot to revert.")
+    else:
+        print("✗ Failed to clear kernel parameters.")
+        sys.exit(1)
+
+# Module-level handlers so each action is unit-testable without argv parsing
+DISPATCH = {"enable": _enable, "disable": _disable}
+
 def main():
     if len(sys.argv) < 2:
         print("Usage: uv run <enable|disable> [core_range]")
         sys.exit(1)
-    
+
     check_root()
-    
+
     action = sys.argv[1]
     core_range = sys.argv[2] if len(sys.argv) > 2 else "1-12"
-    
-    if action == "enable":
-        menu = KernelConfigMenu(core_range)
-        
-        try:
-            apply_config = curses.wrapper(menu.handle_input)
-            
-            if apply_config:
-                selected_params = menu.get_selected_params()
-                
-                if selected_params:
-                    print(f"Applying parameters: {selected_params}")
-                    if update_grub_config(selected_params):
-                        print("✓ Selected kernel parameters installed. Reboot to apply.")
-                    else:
-                        print("✗ Failed to update kernel parameters.")
-                        sys.exit(1)
-                else:
-                    print("No parameters selected. Exiting.")
-            else:
-                print("Configuration cancelled.")
-                
-        except KeyboardInterrupt:
-            print("\nConfiguration cancelled.")
-            sys.exit(0)
-            
-    elif action == "disable":
-        if clear_grub_config():
-            print("✓ Kernel parameters cleared. Reboot to revert.")
-        else:
-            print("✗ Failed to clear kernel parameters.")
-            sys.exit(1)
-    else:
+
+    handler = DISPATCH.get(action)
+    if handler is None:
         print(f"Error: invalid action '{action}' (use enable|disable)")
         sys.exit(1)
+    handler(core_range)
 
 
 if __name__ == "__main__":